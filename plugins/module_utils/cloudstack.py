@@ -8,6 +8,7 @@ __metaclass__ = type
 
 
 import os
+import random
 import sys
 import time
 import traceback
@@ -24,6 +25,13 @@ except ImportError:
     CS_IMP_ERR = traceback.format_exc()
     HAS_LIB_CS = False
 
+try:
+    import requests
+
+    HAS_LIB_REQUESTS = True
+except ImportError:
+    HAS_LIB_REQUESTS = False
+
 
 if sys.version_info > (3,):
     long = int
@@ -108,7 +116,23 @@ class AnsibleCloudStack:
     def cs(self):
         if self._cs is None:
             api_config = self.get_api_config()
-            self._cs = CloudStack(**api_config)
+            # Note: JSON decoding of API responses happens inside the cs
+            # client, so swapping the decoder (e.g. for orjson) would require
+            # support in cs itself; this collection never parses raw payloads.
+            if HAS_LIB_REQUESTS:
+                # Reuse one pooled keep-alive session for all API calls so
+                # TCP/TLS handshakes are amortized over the module run.
+                session = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=10)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                try:
+                    self._cs = CloudStack(session=session, **api_config)
+                except TypeError:
+                    # The installed cs release does not accept a custom session.
+                    self._cs = CloudStack(**api_config)
+            else:
+                self._cs = CloudStack(**api_config)
         return self._cs
 
     def get_api_config(self):
@@ -225,6 +249,25 @@ class AnsibleCloudStack:
 
         return res
 
+    def query_api_iter(self, command, key, pagesize=500, **args):
+        """Yield the results of a list API page by page.
+
+        Lets callers stop consuming once a match is found instead of
+        materializing every page up front like fetch_list=True does.
+        """
+        args.pop("fetch_list", None)
+        args["pagesize"] = pagesize
+        page = 1
+        while True:
+            args["page"] = page
+            res = self.query_api(command, **args)
+            items = res.get(key) or []
+            for item in items:
+                yield item
+            if len(items) < pagesize:
+                return
+            page += 1
+
     def get_network_acl(self, key=None):
         if self.network_acl is None:
             args = {
@@ -618,8 +661,14 @@ class AnsibleCloudStack:
         self.capabilities = capabilities["capability"]
         return self._get_by_key(key, self.capabilities)
 
-    def poll_job(self, job=None, key=None):
+    def poll_job(self, job=None, key=None, base=0.25, cap=5.0):
+        """Poll an async job with exponentially growing, jittered intervals.
+
+        Short jobs are detected quickly while long running jobs are polled
+        less often, and the jitter desynchronizes parallel module runs.
+        """
         if job is not None and "jobid" in job:
+            delay = base
             while True:
                 res = self.query_api("queryAsyncJobResult", jobid=job["jobid"])
                 if res["jobstatus"] != 0 and "jobresult" in res:
@@ -631,9 +680,14 @@ class AnsibleCloudStack:
                         job = res["jobresult"][key]
 
                     break
-                time.sleep(2)
+                time.sleep(delay * random.uniform(0.9, 1.1))
+                delay = min(cap, delay * 1.5)
         return job
 
+    def poll_job_adaptive(self, job=None, key=None, base=1.0, cap=15.0):
+        """Poll with a wider backoff window for jobs expected to run longer."""
+        return self.poll_job(job, key, base=base, cap=cap)
+
     def update_result(self, resource, result=None):
         if result is None:
             result = dict()
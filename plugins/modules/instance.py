@@ -442,12 +442,46 @@ user-data:
 """
 
 import base64
+import hashlib
+import json
+import os
+import random
+import stat
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from ansible.module_utils._text import to_bytes, to_text
-from ansible.module_utils.basic import AnsibleModule
 
+# The cloudstack module_utils import must stay at the top level: the class
+# below inherits from AnsibleCloudStack and the AnsiballZ payload builder
+# only ships module_utils it can discover in top-level imports.
 from ..module_utils.cloudstack import AnsibleCloudStack, cs_argument_spec, cs_required_together
 
+# Lowercased VM state groups, shared by the lifecycle methods below.
+VM_STATES_RUNNING = frozenset(("starting", "running"))
+VM_STATES_STOPPED = frozenset(("stopping", "stopped"))
+VM_STATES_DESTROYED = frozenset(("destroying", "destroyed"))
+VM_STATES_GONE = frozenset(("expunging", "destroying", "destroyed"))
+
+# Built once at import instead of per module invocation.
+STATE_CHOICES = ("present", "deployed", "started", "stopped", "restarted", "restored", "absent", "destroyed", "expunged")
+TEMPLATE_FILTER_CHOICES = ("all", "featured", "self", "selfexecutable", "sharedexecutable", "executable", "community")
+KEYBOARD_CHOICES = ("de", "de-ch", "es", "fi", "fr", "fr-be", "fr-ch", "is", "it", "jp", "nl-be", "no", "pt", "uk", "us")
+
+# Lifetime of the cross-invocation listVirtualMachines cache. Kept short so
+# stale VM state cannot outlive a typical deploy-then-configure sequence.
+VM_LIST_CACHE_TTL = 30
+
+
+class LookupFailure(Exception):
+    """Carries fail_json kwargs from a worker thread back to the main thread."""
+
+    def __init__(self, kwargs):
+        super(LookupFailure, self).__init__(kwargs.get("msg", "Lookup failed"))
+        self.kwargs = kwargs
+
 
 class AnsibleCloudStackInstance(AnsibleCloudStack):
 
@@ -470,17 +504,77 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
         self.instance = None
         self.template = None
         self.iso = None
+        self._user_data_encoded = None
+        self._networks_index = None
+        self._host_id = None
+        self._security_groups_joined = None
+        self._api_cache = {}
+        self._api_cache_lock = threading.Lock()
+
+    def batch_poll_jobs(self, job_refs):
+        """Poll several async jobs with one listAsyncJobs call per interval.
+
+        job_refs is a list of (job, key) tuples as accepted by poll_job,
+        results are returned in the same order. Batching the status query
+        keeps the HTTP round trips per interval constant no matter how
+        many jobs are in flight.
+        """
+        if len(job_refs) == 1:
+            job, job_key = job_refs[0]
+            return [self.poll_job_adaptive(job, job_key)]
+
+        results = [job for job, dummy in job_refs]
+        pending = {}
+        for i, (job, dummy) in enumerate(job_refs):
+            if job is not None and "jobid" in job:
+                pending[job["jobid"]] = i
+
+        delay = 1.0
+        while pending:
+            res = self.query_api("listAsyncJobs", listall=True)
+            listed = dict((j["jobid"], j) for j in res.get("asyncjobs") or [] if j.get("jobid") in pending)
+            for jobid in list(pending):
+                entry = listed.get(jobid)
+                if entry is None:
+                    # Not visible in the listing, resolve it individually so
+                    # the batch cannot stall on it.
+                    index = pending.pop(jobid)
+                    results[index] = self.poll_job_adaptive({"jobid": jobid}, job_refs[index][1])
+                elif entry["jobstatus"] != 0 and "jobresult" in entry:
+                    index = pending.pop(jobid)
+                    jobresult = entry["jobresult"]
+
+                    if "errortext" in jobresult:
+                        self.fail_json(msg="Failed: '%s'" % jobresult["errortext"])
+
+                    job_key = job_refs[index][1]
+                    if job_key and job_key in jobresult:
+                        results[index] = jobresult[job_key]
+            if pending:
+                time.sleep(delay + random.uniform(0, delay * 0.3))
+                delay = min(15.0, delay * 1.7)
+        return results
+
+    def _cached_query(self, command, **args):
+        """Cache idempotent list API results for the duration of a module run."""
+        key = (command, tuple(sorted(args.items())))
+        with self._api_cache_lock:
+            if key in self._api_cache:
+                return self._api_cache[key]
+        res = self.query_api(command, **args)
+        with self._api_cache_lock:
+            return self._api_cache.setdefault(key, res)
 
     def get_service_offering_id(self):
         service_offering = self.module.params.get("service_offering")
 
-        service_offerings = self.query_api("listServiceOfferings")
+        service_offerings = self._cached_query("listServiceOfferings")
         if service_offerings:
             if not service_offering:
                 return service_offerings["serviceoffering"][0]["id"]
 
             for s in service_offerings["serviceoffering"]:
-                if service_offering in [s["name"], s["id"]]:
+                if service_offering == s["name"] or service_offering == s["id"]:
                     return s["id"]
         self.fail_json(msg="Service offering '%s' not found" % service_offering)
 
@@ -489,15 +583,20 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
         if not host_name:
             return None
 
+        # The host param does not change mid-run, resolve it once.
+        if self._host_id:
+            return self._host_id
+
         args = {
             "type": "routing",
             "zoneid": self.get_zone(key="id"),
         }
-        hosts = self.query_api("listHosts", **args)
+        hosts = self._cached_query("listHosts", **args)
         if hosts:
             for h in hosts["host"]:
-                if host_name in [h["name"], h["id"]]:
-                    return h["id"]
+                if host_name == h["name"] or host_name == h["id"]:
+                    self._host_id = h["id"]
+                    return self._host_id
 
         self.fail_json(msg="Host '%s' not found" % host_name)
 
@@ -507,10 +606,10 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
             return None
 
         args = {"zoneid": self.get_zone(key="id")}
-        clusters = self.query_api("listClusters", **args)
+        clusters = self._cached_query("listClusters", **args)
         if clusters:
             for c in clusters["cluster"]:
-                if cluster_name in [c["name"], c["id"]]:
+                if cluster_name == c["name"] or cluster_name == c["id"]:
                     return c["id"]
 
         self.fail_json(msg="Cluster '%s' not found" % cluster_name)
@@ -521,10 +620,10 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
             return None
 
         args = {"zoneid": self.get_zone(key="id")}
-        pods = self.query_api("listPods", **args)
+        pods = self._cached_query("listPods", **args)
         if pods:
             for p in pods["pod"]:
-                if pod_name in [p["name"], p["id"]]:
+                if pod_name == p["name"] or pod_name == p["id"]:
                     return p["id"]
 
         self.fail_json(msg="Pod '%s' not found" % pod_name)
@@ -536,30 +635,34 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
         if not template and not iso:
             return None
 
+        # Return the cached match before building the args dict below, its
+        # account/domain/project/zone lookups are not for free either.
+        if template and self.template:
+            return self._get_by_key(key, self.template)
+        if iso and self.iso:
+            return self._get_by_key(key, self.iso)
+
         args = {
             "account": self.get_account(key="name"),
             "domainid": self.get_domain(key="id"),
             "projectid": self.get_project(key="id"),
             "zoneid": self.get_zone(key="id"),
             "isrecursive": True,
-            "fetch_list": True,
         }
 
+        # Iterate the pages lazily so the scan stops at the first match
+        # instead of fetching every template or ISO in the account.
         if template:
-            if self.template:
-                return self._get_by_key(key, self.template)
-
             rootdisksize = self.module.params.get("root_disk_size")
+            # Compute the byte limit once instead of per candidate template.
+            size_limit = rootdisksize * 1024**3 if rootdisksize else None
             args["templatefilter"] = self.module.params.get("template_filter")
-            args["fetch_list"] = True
-            templates = self.query_api("listTemplates", **args)
-            if templates:
-                for t in templates:
-                    if template in [t.get("displaytext", None), t["name"], t["id"]]:
-                        if rootdisksize and t["size"] > rootdisksize * 1024**3:
-                            continue
-                        self.template = t
-                        return self._get_by_key(key, self.template)
+            for t in self.query_api_iter("listTemplates", "template", **args):
+                if template == t.get("displaytext") or template == t["name"] or template == t["id"]:
+                    if size_limit and t["size"] > size_limit:
+                        continue
+                    self.template = t
+                    return self._get_by_key(key, self.template)
 
             if rootdisksize:
                 more_info = " (with size <= %s)" % rootdisksize
@@ -569,20 +672,114 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
             self.module.fail_json(msg="Template '%s' not found%s" % (template, more_info))
 
         elif iso:
-            if self.iso:
-                return self._get_by_key(key, self.iso)
-
             args["isofilter"] = self.module.params.get("template_filter")
-            args["fetch_list"] = True
-            isos = self.query_api("listIsos", **args)
-            if isos:
-                for i in isos:
-                    if iso in [i["displaytext"], i["name"], i["id"]]:
-                        self.iso = i
-                        return self._get_by_key(key, self.iso)
+            for i in self.query_api_iter("listIsos", "iso", **args):
+                if iso == i["displaytext"] or iso == i["name"] or iso == i["id"]:
+                    self.iso = i
+                    return self._get_by_key(key, self.iso)
 
             self.module.fail_json(msg="ISO '%s' not found" % iso)
 
+    def _vm_list_cache_path(self):
+        """Return the cache file path inside a private per-user directory.
+
+        A predictable file in the shared temp dir could be pre-created by
+        another local user, so the cache lives in a directory that is
+        created 0700 and verified to be a real directory owned by the
+        current user with no group or world access. Returns None when no
+        trustworthy location is available.
+        """
+        runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+        if runtime_dir:
+            cache_dir = os.path.join(runtime_dir, "ansible-cs-cache")
+        else:
+            cache_dir = os.path.join(tempfile.gettempdir(), "ansible-cs-cache-%d" % os.getuid())
+        try:
+            os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+            st = os.lstat(cache_dir)
+        except OSError:
+            return None
+        if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+            return None
+        return os.path.join(cache_dir, "vms.json")
+
+    def _vm_list_cache_key(self, args):
+        # The endpoint digest keeps plays against different clouds from
+        # serving each other's VM lists within the TTL.
+        endpoint = to_bytes(self.module.params.get("api_url") or "")
+        digest = hashlib.sha256(endpoint).hexdigest()[:16]
+        return "|".join([digest] + [str(args.get(key)) for key in ("account", "domainid", "projectid")])
+
+    def _read_cached_vm_list(self, args):
+        """Return the cached listVirtualMachines result for args, or None.
+
+        Ansible runs this module once per task, so consecutive tasks of a
+        deploy-then-start sequence would repeat the same list call. The
+        cache persists across invocations in a per-user file and is only
+        trusted within VM_LIST_CACHE_TTL seconds.
+        """
+        path = self._vm_list_cache_path()
+        if path is None:
+            return None
+        try:
+            with open(path) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return None
+        entry = cache.get(self._vm_list_cache_key(args))
+        if not entry:
+            return None
+        age = time.time() - entry.get("time", 0)
+        # A negative age means a forged or clock-skewed timestamp; treat it
+        # as expired instead of honoring it indefinitely.
+        if age < 0 or age > VM_LIST_CACHE_TTL:
+            return None
+        return entry.get("virtualmachine")
+
+    def _write_cached_vm_list(self, args, virtual_machines):
+        path = self._vm_list_cache_path()
+        if path is None:
+            return
+        try:
+            with open(path) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        cache[self._vm_list_cache_key(args)] = {
+            "time": time.time(),
+            "virtualmachine": virtual_machines,
+        }
+        tmp_path = "%s.%d.tmp" % (path, os.getpid())
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump(cache, f)
+            # Atomic rename so concurrent invocations never read a torn file.
+            os.replace(tmp_path, path)
+        except OSError:
+            # Caching is best effort, a read-only temp dir must not fail the run.
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+    def _invalidate_vm_list_cache(self):
+        path = self._vm_list_cache_path()
+        if path is None:
+            return
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def query_api(self, command, **args):
+        res = super(AnsibleCloudStackInstance, self).query_api(command, **args)
+        # Any non-read command may change VM state, so drop the
+        # cross-invocation list cache rather than serve stale facts.
+        if not command.startswith(("list", "get", "query")):
+            self._invalidate_vm_list_cache()
+        return res
+
     def get_instance(self, refresh=False):
         instance = self.instance
         if not instance or refresh:
@@ -591,23 +788,28 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
                 "account": self.get_account(key="name"),
                 "domainid": self.get_domain(key="id"),
                 "projectid": self.get_project(key="id"),
-                "fetch_list": True,
             }
             # Do not pass zoneid, as the instance name must be unique across zones.
-            instances = self.query_api("listVirtualMachines", **args)
-            if instances:
-                for v in instances:
-                    if instance_name.lower() in [v["name"].lower(), v["displayname"].lower(), v["id"]]:
-
-                        if "keypairs" not in v:
-                            v["keypairs"] = list()
-
-                        # Workaround for keypairs not a list
-                        if not isinstance(v["keypairs"], list):
-                            v["keypairs"] = [v["keypairs"]]
-
-                        self.instance = v
-                        break
+            # Reuse the short-lived cross-invocation cache unless an
+            # authoritative read was requested.
+            instances = None if refresh else self._read_cached_vm_list(args)
+            if instances is None:
+                instances = list(self.query_api_iter("listVirtualMachines", "virtualmachine", **args))
+                self._write_cached_vm_list(args, instances)
+            # Casefold the requested name once, not per candidate VM.
+            instance_name_folded = instance_name.casefold()
+            for v in instances:
+                if instance_name_folded == v["name"].casefold() or instance_name_folded == v["displayname"].casefold() or instance_name_folded == v["id"]:
+
+                    if "keypairs" not in v:
+                        v["keypairs"] = list()
+
+                    # Workaround for keypairs not a list
+                    if not isinstance(v["keypairs"], list):
+                        v["keypairs"] = [v["keypairs"]]
+
+                    self.instance = v
+                    break
 
         return self.instance
 
@@ -626,10 +828,10 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
             # 'name': name,
         }
 
-        user_data_list = self.query_api("listUserData", **args)
+        user_data_list = self._cached_query("listUserData", **args)
         if user_data_list:
             for v in user_data_list.get("userdata") or []:
-                if name in [v["name"], v["id"]]:
+                if name == v["name"] or name == v["id"]:
                     return v["id"]
         self.module.fail_json(msg="User data '%s' not found" % user_data_list)
 
@@ -645,11 +847,12 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
         return user_data
 
     def get_iptonetwork_mappings(self):
-        network_mappings = self.module.params.get("ip_to_networks")
+        params = self.module.params
+        network_mappings = params.get("ip_to_networks")
         if network_mappings is None:
             return
 
-        if network_mappings and self.module.params.get("networks"):
+        if network_mappings and params.get("networks"):
             self.module.fail_json(msg="networks and ip_to_networks are mutually exclusive.")
 
         network_names = [n["network"] for n in network_mappings]
@@ -659,19 +862,15 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
             res.append(dict(networkid=ids[i], **data))
         return res
 
-    def get_ssh_keypair(self, name, key=None, fail_on_missing=True):
+    def get_ssh_keypair_fingerprints(self):
+        """Return a name to fingerprint dict of all SSH key pairs, fetched in one call."""
         args = {
             "domainid": self.get_domain("id"),
             "account": self.get_account("name"),
             "projectid": self.get_project("id"),
-            "name": name,
         }
-        ssh_key_pairs = self.query_api("listSSHKeyPairs", **args)
-        if "sshkeypair" in ssh_key_pairs:
-            return self._get_by_key(key=key, my_dict=ssh_key_pairs["sshkeypair"][0])
-
-        elif fail_on_missing:
-            self.module.fail_json(msg="SSH key not found: %s" % name)
+        ssh_key_pairs = self._cached_query("listSSHKeyPairs", **args)
+        return dict((k["name"], k["fingerprint"]) for k in ssh_key_pairs.get("sshkeypair") or [])
 
     def ssh_keys_changed(self):
         ssh_keys = self.module.params.get("ssh_keys")
@@ -680,7 +879,15 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
 
         instance_ssh_keys = self.instance.get("keypairs") or [self.instance.get("keypair") or ""]
 
-        param_ssh_key_fingerprints = [self.get_ssh_keypair(key="fingerprint", name=ssh_key) for ssh_key in ssh_keys]
+        # One listSSHKeyPairs call covers the parameter and the instance key
+        # lookups instead of one call per key name.
+        fingerprints = self.get_ssh_keypair_fingerprints()
+
+        param_ssh_key_fingerprints = []
+        for ssh_key in ssh_keys:
+            if ssh_key not in fingerprints:
+                self.module.fail_json(msg="SSH key not found: %s" % ssh_key)
+            param_ssh_key_fingerprints.append(fingerprints[ssh_key])
 
         for instance_ssh_key in instance_ssh_keys:
 
@@ -688,7 +895,7 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
                 return True
 
             # Get fingerprint for keypair of instance but do not fail if inexistent.
-            instance_ssh_key_fingerprint = self.get_ssh_keypair(key="fingerprint", name=instance_ssh_key, fail_on_missing=False)
+            instance_ssh_key_fingerprint = fingerprints.get(instance_ssh_key)
             if not instance_ssh_key_fingerprint:
                 return True
 
@@ -697,25 +904,46 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
                 return True
         return False
 
+    def _get_security_groups_joined(self):
+        """Return the security_groups param as a CSV string, joined once per run."""
+        if self._security_groups_joined is None:
+            self._security_groups_joined = ",".join(self.module.params.get("security_groups") or ())
+        return self._security_groups_joined
+
     def security_groups_changed(self):
         security_groups = self.module.params.get("security_groups")
         if security_groups is None:
             return False
 
-        security_groups = [s.lower() for s in security_groups]
-        instance_security_groups = self.instance.get("securitygroup") or []
+        # A single set comparison catches any asymmetric difference without
+        # the quadratic membership scans.
+        wanted_security_groups = set(s.casefold() for s in security_groups)
+        instance_security_groups = set(g["name"].casefold() for g in self.instance.get("securitygroup") or [])
+        return wanted_security_groups != instance_security_groups
 
-        instance_security_group_names = []
-        for instance_security_group in instance_security_groups:
-            if instance_security_group["name"].lower() not in security_groups:
-                return True
-            else:
-                instance_security_group_names.append(instance_security_group["name"].lower())
+    def _get_networks_index(self):
+        """Return an identifier to network dict, fetched and indexed once per run."""
+        if self._networks_index is None:
+            args = {
+                "account": self.get_account(key="name"),
+                "domainid": self.get_domain(key="id"),
+                "projectid": self.get_project(key="id"),
+                "zoneid": self.get_zone(key="id"),
+                "fetch_list": True,
+            }
+            networks = self._cached_query("listNetworks", **args)
+            if not networks:
+                self.module.fail_json(msg="No networks available")
 
-        for security_group in security_groups:
-            if security_group not in instance_security_group_names:
-                return True
-        return False
+            # Index the networks once so each requested name is an O(1) lookup
+            # instead of a scan over the full network list.
+            networks_by_identifier = {}
+            for n in networks:
+                networks_by_identifier.setdefault(n["id"], n)
+                networks_by_identifier.setdefault(n["name"], n)
+                networks_by_identifier.setdefault(n["displaytext"], n)
+            self._networks_index = networks_by_identifier
+        return self._networks_index
 
     def get_network_ids(self, network_names=None):
         if network_names is None:
@@ -724,153 +952,241 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
         if not network_names:
             return None
 
-        args = {
-            "account": self.get_account(key="name"),
-            "domainid": self.get_domain(key="id"),
-            "projectid": self.get_project(key="id"),
-            "zoneid": self.get_zone(key="id"),
-            "fetch_list": True,
-        }
-        networks = self.query_api("listNetworks", **args)
-        if not networks:
-            self.module.fail_json(msg="No networks available")
+        networks_by_identifier = self._get_networks_index()
 
         network_ids = []
         network_displaytexts = []
         for network_name in network_names:
-            for n in networks:
-                if network_name in [n["displaytext"], n["name"], n["id"]]:
-                    network_ids.append(n["id"])
-                    network_displaytexts.append(n["name"])
-                    break
+            n = networks_by_identifier.get(network_name)
+            if n:
+                network_ids.append(n["id"])
+                network_displaytexts.append(n["name"])
 
         if len(network_ids) != len(network_names):
             self.module.fail_json(msg="Could not find all networks, networks list found: %s" % network_displaytexts)
 
         return network_ids
 
+    def _resolve_networks(self):
+        """Resolve the networks and ip_to_networks params in a single pass.
+
+        Returns a tuple of the joined network IDs and the ip to network
+        mappings. The params are mutually exclusive so at most one side is
+        populated, both served from the shared network index.
+        """
+        network_ids = self.get_network_ids()
+        if network_ids is not None:
+            network_ids = ",".join(network_ids)
+        return network_ids, self.get_iptonetwork_mappings()
+
+    def _run_lookups_parallel(self, lookups):
+        """Run independent lookup callables in a thread pool.
+
+        fail_json prints the result JSON and exits, which must not happen
+        from a worker thread: parallel failures would interleave their
+        output and the exit relies on SystemExit escaping the future. While
+        the pool runs, failures are converted to LookupFailure and the
+        first one is reported through fail_json from the calling thread.
+        """
+        original_fail_json = self.module.fail_json
+
+        def fail_json_raise(**kwargs):
+            raise LookupFailure(kwargs)
+
+        results = {}
+        error = None
+        self.module.fail_json = fail_json_raise
+        try:
+            with ThreadPoolExecutor(max_workers=len(lookups)) as executor:
+                futures = dict((name, executor.submit(lookup)) for name, lookup in lookups.items())
+                for name, future in futures.items():
+                    try:
+                        results[name] = future.result()
+                    except LookupFailure as e:
+                        if error is None:
+                            error = e
+        finally:
+            self.module.fail_json = original_fail_json
+        if error is not None:
+            self.module.fail_json(**error.kwargs)
+        return results
+
     def present_instance(self, start_vm=True):
         instance = self.get_instance()
 
         if not instance:
             instance = self.deploy_instance(start_vm=start_vm)
+            # The synchronous deployVirtualMachine response carries both id
+            # and jobid, so only a returned state marks the polled result.
+            if instance and "state" in instance:
+                # The polled deploy result already carries the canonical VM
+                # state, skip the extra listVirtualMachines round trip and
+                # normalize keypairs the same way get_instance does.
+                if "keypairs" not in instance:
+                    instance["keypairs"] = list()
+                if not isinstance(instance["keypairs"], list):
+                    instance["keypairs"] = [instance["keypairs"]]
+                self.instance = instance
+            elif instance:
+                # Without poll_async we only got a deploy stub back.
+                instance = self.get_instance(refresh=True)
         else:
             instance = self.recover_instance(instance=instance)
             instance = self.update_instance(instance=instance, start_vm=start_vm)
+            if instance:
+                instance = self.get_instance(refresh=True)
 
         # In check mode, we do not necessarily have an instance
         if instance:
-            instance = self.get_instance(refresh=True)
-            instance = self.ensure_tags(resource=instance, resource_type="UserVm")
+            # Tag reconciliation and the user data lookup are independent
+            # API round trips, overlap them.
+            results = self._run_lookups_parallel(
+                {
+                    "instance": lambda: self.ensure_tags(resource=instance, resource_type="UserVm"),
+                    "userdata": lambda: self._get_instance_user_data(instance),
+                }
+            )
+            instance = results["instance"]
+            instance["userdata"] = results["userdata"]
             # refresh instance data
             self.instance = instance
 
         return instance
 
     def get_user_data(self):
-        user_data = self.module.params.get("user_data")
-        if user_data is not None:
-            user_data = to_text(base64.b64encode(to_bytes(user_data)))
-        return user_data
+        # Encode once per run, user data may be up to 32KB and this is
+        # called from both the deploy and the update path.
+        if self._user_data_encoded is None:
+            user_data = self.module.params.get("user_data")
+            if user_data is not None:
+                self._user_data_encoded = to_text(base64.b64encode(to_bytes(user_data)))
+        return self._user_data_encoded
 
     def get_details(self):
-        details = self.module.params.get("details")
+        params = self.module.params
+        details = params.get("details")
 
-        cpu = self.module.params.get("cpu")
-        cpu_speed = self.module.params.get("cpu_speed")
-        memory = self.module.params.get("memory")
+        cpu = params.get("cpu")
+        cpu_speed = params.get("cpu_speed")
+        memory = params.get("memory")
 
-        if any([cpu, cpu_speed, memory]):
+        if cpu or cpu_speed or memory:
             if details is None:
                 details = {}
 
-            if cpu:
-                details["cpuNumber"] = cpu
-
-            if cpu_speed:
-                details["cpuSpeed"] = cpu_speed
-
-            if memory:
-                details["memory"] = memory
+            for detail_key, value in (("cpuNumber", cpu), ("cpuSpeed", cpu_speed), ("memory", memory)):
+                if value:
+                    details[detail_key] = value
 
         return details
 
     def deploy_instance(self, start_vm=True):
         self.result["changed"] = True
-        networkids = self.get_network_ids()
-        if networkids is not None:
-            networkids = ",".join(networkids)
 
-        args = {}
-        args["templateid"] = self.get_template_or_iso(key="id")
-        if not args["templateid"]:
+        # Resolve the lookups the concurrent ones below all depend on first,
+        # so the worker threads only hit their memoized results.
+        self.get_zone(key="id")
+        self.get_account(key="name")
+        self.get_domain(key="id")
+        self.get_project(key="id")
+
+        # These lookups are independent blocking API round trips, overlap
+        # their network latency instead of paying for each one in turn.
+        lookups = {
+            "template_iso": self.get_template_or_iso,
+            "serviceofferingid": self.get_service_offering_id,
+            "diskofferingid": lambda: self.get_disk_offering(key="id"),
+            "networks": self._resolve_networks,
+            "userdataid": self.get_user_data_id_by_name,
+            "hostid": self.get_host_id,
+            "clusterid": self.get_cluster_id,
+            "podid": self.get_pod_id,
+        }
+        args = self._run_lookups_parallel(lookups)
+
+        args["networkids"], args["iptonetworklist"] = args.pop("networks")
+
+        # The lookup already returned the full template/ISO dict, extract the
+        # fields locally instead of resolving it a second time.
+        template_iso = args.pop("template_iso")
+        if not template_iso:
             self.module.fail_json(msg="Template or ISO is required.")
+        args["templateid"] = template_iso["id"]
 
         args["zoneid"] = self.get_zone(key="id")
-        args["serviceofferingid"] = self.get_service_offering_id()
         args["account"] = self.get_account(key="name")
         args["domainid"] = self.get_domain(key="id")
         args["projectid"] = self.get_project(key="id")
-        args["diskofferingid"] = self.get_disk_offering(key="id")
-        args["networkids"] = networkids
-        args["iptonetworklist"] = self.get_iptonetwork_mappings()
+        params = self.module.params
         args["userdata"] = self.get_user_data()
-        args["userdataid"] = self.get_user_data_id_by_name()
-        args["userdatadetails"] = self.module.params.get("user_data_details")
-        args["keyboard"] = self.module.params.get("keyboard")
-        args["ipaddress"] = self.module.params.get("ip_address")
-        args["ip6address"] = self.module.params.get("ip6_address")
-        args["name"] = self.module.params.get("name")
+        args["userdatadetails"] = params.get("user_data_details")
+        args["keyboard"] = params.get("keyboard")
+        args["ipaddress"] = params.get("ip_address")
+        args["ip6address"] = params.get("ip6_address")
+        args["name"] = params.get("name")
         args["displayname"] = self.get_or_fallback("display_name", "name")
-        args["group"] = self.module.params.get("group")
-        args["keypairs"] = self.module.params.get("ssh_keys")
-        args["size"] = self.module.params.get("disk_size")
+        args["group"] = params.get("group")
+        args["keypairs"] = params.get("ssh_keys")
+        args["size"] = params.get("disk_size")
         args["startvm"] = start_vm
-        args["rootdisksize"] = self.module.params.get("root_disk_size")
-        args["affinitygroupnames"] = self.module.params.get("affinity_groups")
+        args["rootdisksize"] = params.get("root_disk_size")
+        args["affinitygroupnames"] = params.get("affinity_groups")
         args["details"] = self.get_details()
-        args["securitygroupnames"] = self.module.params.get("security_groups")
-        args["hostid"] = self.get_host_id()
-        args["clusterid"] = self.get_cluster_id()
-        args["podid"] = self.get_pod_id()
+        args["securitygroupnames"] = params.get("security_groups")
 
-        template_iso = self.get_template_or_iso()
-        if template_iso and "hypervisor" not in template_iso:
+        if "hypervisor" not in template_iso:
             args["hypervisor"] = self.get_hypervisor()
 
         instance = None
         if not self.module.check_mode:
             instance = self.query_api("deployVirtualMachine", **args)
 
-            poll_async = self.module.params.get("poll_async")
+            poll_async = params.get("poll_async")
             if poll_async:
-                instance = self.poll_job(instance, "virtualmachine")
+                instance = self.poll_job_adaptive(instance, "virtualmachine")
         return instance
 
+    def _get_root_volume(self, instance):
+        """Return the ROOT volume of the instance, cached for the module run."""
+        args = {
+            "type": "ROOT",
+            "virtualmachineid": instance["id"],
+            "account": instance.get("account"),
+            "domainid": instance.get("domainid"),
+            "projectid": instance.get("projectid"),
+        }
+        res = self._cached_query("listVolumes", **args)
+        volumes = res.get("volume") or []
+        if not volumes:
+            self.module.fail_json(msg="Root volume of instance '%s' not found" % instance["name"])
+        return volumes[0]
+
     def update_instance(self, instance, start_vm=True):
+        params = self.module.params
+
         # Service offering data
         args_service_offering = {
             "id": instance["id"],
         }
-        if self.module.params.get("service_offering"):
+        if params.get("service_offering"):
             args_service_offering["serviceofferingid"] = self.get_service_offering_id()
         service_offering_changed = self.has_changed(args_service_offering, instance)
 
         # Instance UserData
-        if self.module.params.get("user_data_name") is not None:
+        if params.get("user_data_name") is not None:
             args_instance_update = {"id": instance["id"], "userdataid": self.get_user_data_id_by_name()}
         else:
             args_instance_update = {"id": instance["id"], "userdata": self.get_user_data()}
             instance["userdata"] = self._get_instance_user_data(instance)
 
-        if self.module.params.get("user_data_details"):
-            args_instance_update["userdatadetails"] = self.module.params.get("user_data_details")
+        if params.get("user_data_details"):
+            args_instance_update["userdatadetails"] = params.get("user_data_details")
 
         args_instance_update["ostypeid"] = self.get_os_type(key="id")
-        if self.module.params.get("group"):
-            args_instance_update["group"] = self.module.params.get("group")
-        if self.module.params.get("display_name"):
-            args_instance_update["displayname"] = self.module.params.get("display_name")
+        if params.get("group"):
+            args_instance_update["group"] = params.get("group")
+        if params.get("display_name"):
+            args_instance_update["displayname"] = params.get("display_name")
         instance_changed = self.has_changed(args_instance_update, instance)
 
         ssh_keys_changed = self.ssh_keys_changed()
@@ -879,41 +1195,28 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
 
         # Volume data
         args_volume_update = {}
-        root_disk_size = self.module.params.get("root_disk_size")
+        root_disk_size = params.get("root_disk_size")
         root_disk_size_changed = False
 
         if root_disk_size is not None:
-            args = {
-                "type": "ROOT",
-                "virtualmachineid": instance["id"],
-                "account": instance.get("account"),
-                "domainid": instance.get("domainid"),
-                "projectid": instance.get("projectid"),
-            }
-            res = self.query_api("listVolumes", **args)
-            [volume] = res["volume"]
+            volume = self._get_root_volume(instance)
 
             size = volume["size"] >> 30
 
-            args_volume_update["id"] = volume["id"]
-            args_volume_update["size"] = root_disk_size
-
-            shrinkok = self.module.params.get("allow_root_disk_shrink")
+            args_volume_update = {
+                "id": volume["id"],
+                "size": root_disk_size,
+            }
+            shrinkok = params.get("allow_root_disk_shrink")
             if shrinkok:
                 args_volume_update["shrinkok"] = shrinkok
 
             root_disk_size_changed = root_disk_size != size
 
-        changed = [
-            service_offering_changed,
-            instance_changed,
-            security_groups_changed,
-            ssh_keys_changed,
-            root_disk_size_changed,
-        ]
+        any_changed = service_offering_changed or instance_changed or security_groups_changed or ssh_keys_changed or root_disk_size_changed
 
-        if any(changed):
-            force = self.module.params.get("force")
+        if any_changed:
+            force = params.get("force")
             instance_state = instance["state"].lower()
             if instance_state == "stopped" or force:
                 self.result["changed"] = True
@@ -921,7 +1224,7 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
 
                     # Ensure VM has stopped
                     instance = self.stop_instance()
-                    instance = self.poll_job(instance, "virtualmachine")
+                    instance = self.poll_job_adaptive(instance, "virtualmachine")
                     self.instance = instance
 
                     # Change service offering
@@ -933,27 +1236,39 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
                     # Update VM
                     if instance_changed or security_groups_changed:
                         if security_groups_changed:
-                            args_instance_update["securitygroupnames"] = ",".join(self.module.params.get("security_groups"))
+                            args_instance_update["securitygroupnames"] = self._get_security_groups_joined()
                         res = self.query_api("updateVirtualMachine", **args_instance_update)
                         instance = res["virtualmachine"]
                         self.instance = instance
 
-                    # Reset SSH key
+                    # The SSH key reset and the root disk resize are
+                    # independent async jobs. Submit both before waiting so
+                    # they run concurrently on the management server and the
+                    # wall time is the slower of the two, not the sum.
+                    ssh_key_job = None
                     if ssh_keys_changed:
                         # SSH key data
                         args_ssh_key = {
                             "id": instance["id"],
                             "projectid": self.get_project(key="id"),
-                            "keypairs": self.module.params.get("ssh_keys"),
+                            "keypairs": params.get("ssh_keys"),
                         }
-                        instance = self.query_api("resetSSHKeyForVirtualMachine", **args_ssh_key)
-                        instance = self.poll_job(instance, "virtualmachine")
-                        self.instance = instance
+                        ssh_key_job = self.query_api("resetSSHKeyForVirtualMachine", **args_ssh_key)
 
-                    # Root disk size
+                    volume_job = None
                     if root_disk_size_changed:
-                        async_result = self.query_api("resizeVolume", **args_volume_update)
-                        self.poll_job(async_result, "volume")
+                        volume_job = self.query_api("resizeVolume", **args_volume_update)
+
+                    pending_jobs = []
+                    if ssh_key_job:
+                        pending_jobs.append((ssh_key_job, "virtualmachine"))
+                    if volume_job:
+                        pending_jobs.append((volume_job, "volume"))
+                    if pending_jobs:
+                        job_results = self.batch_poll_jobs(pending_jobs)
+                        if ssh_key_job:
+                            instance = job_results[0]
+                            self.instance = instance
 
                     # Start VM again if it was running before
                     if instance_state == "running" and start_vm:
@@ -964,13 +1279,12 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
                 )
 
         # migrate to other host
-        host_changed = all(
-            [
-                instance["state"].lower() in ["starting", "running"],
-                instance.get("hostname") is not None,
-                self.module.params.get("host") is not None,
-                self.module.params.get("host") != instance.get("hostname"),
-            ]
+        host_param = params.get("host")
+        host_changed = (
+            host_param is not None
+            and instance["state"].lower() in VM_STATES_RUNNING
+            and instance.get("hostname") is not None
+            and host_param != instance["hostname"]
         )
         if host_changed:
             self.result["changed"] = True
@@ -980,12 +1294,12 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
             }
             if not self.module.check_mode:
                 res = self.query_api("migrateVirtualMachine", **args_host)
-                instance = self.poll_job(res, "virtualmachine")
+                instance = self.poll_job_adaptive(res, "virtualmachine")
 
         return instance
 
     def recover_instance(self, instance):
-        if instance["state"].lower() in ["destroying", "destroyed"]:
+        if instance["state"].lower() in VM_STATES_DESTROYED:
             self.result["changed"] = True
             if not self.module.check_mode:
                 res = self.query_api("recoverVirtualMachine", id=instance["id"])
@@ -995,32 +1309,34 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
     def absent_instance(self):
         instance = self.get_instance()
         if instance:
-            if instance["state"].lower() not in ["expunging", "destroying", "destroyed"]:
+            if instance["state"].lower() not in VM_STATES_GONE:
                 self.result["changed"] = True
                 if not self.module.check_mode:
                     res = self.query_api("destroyVirtualMachine", id=instance["id"])
 
-                    poll_async = self.module.params.get("poll_async")
-                    if poll_async:
+                    if self.module.params.get("poll_async"):
                         instance = self.poll_job(res, "virtualmachine")
+                        if instance and "id" in instance:
+                            self.instance = instance
         return instance
 
     def expunge_instance(self):
         instance = self.get_instance()
         if instance:
+            check_mode = self.module.check_mode
             res = {}
-            if instance["state"].lower() in ["destroying", "destroyed"]:
+            state = instance["state"].lower()
+            if state in VM_STATES_DESTROYED:
                 self.result["changed"] = True
-                if not self.module.check_mode:
+                if not check_mode:
                     res = self.query_api("destroyVirtualMachine", id=instance["id"], expunge=True)
 
-            elif instance["state"].lower() not in ["expunging"]:
+            elif state != "expunging":
                 self.result["changed"] = True
-                if not self.module.check_mode:
+                if not check_mode:
                     res = self.query_api("destroyVirtualMachine", id=instance["id"], expunge=True)
 
-            poll_async = self.module.params.get("poll_async")
-            if poll_async:
+            if self.module.params.get("poll_async"):
                 res = self.poll_job(res, "virtualmachine")
         return instance
 
@@ -1028,27 +1344,30 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
         instance = self.get_instance()
         # in check mode instance may not be instantiated
         if instance:
-            if instance["state"].lower() in ["stopping", "stopped"]:
+            state = instance["state"].lower()
+            if state in VM_STATES_STOPPED:
                 return instance
 
-            if instance["state"].lower() in ["starting", "running"]:
+            if state in VM_STATES_RUNNING:
                 self.result["changed"] = True
                 if not self.module.check_mode:
                     instance = self.query_api("stopVirtualMachine", id=instance["id"])
 
-                    poll_async = self.module.params.get("poll_async")
-                    if poll_async:
+                    if self.module.params.get("poll_async"):
                         instance = self.poll_job(instance, "virtualmachine")
+                        if instance and "id" in instance:
+                            self.instance = instance
         return instance
 
     def start_instance(self):
         instance = self.get_instance()
         # in check mode instance may not be instantiated
         if instance:
-            if instance["state"].lower() in ["starting", "running"]:
+            state = instance["state"].lower()
+            if state in VM_STATES_RUNNING:
                 return instance
 
-            if instance["state"].lower() in ["stopped", "stopping"]:
+            if state in VM_STATES_STOPPED:
                 self.result["changed"] = True
                 if not self.module.check_mode:
                     args = {
@@ -1057,25 +1376,28 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
                     }
                     instance = self.query_api("startVirtualMachine", **args)
 
-                    poll_async = self.module.params.get("poll_async")
-                    if poll_async:
+                    if self.module.params.get("poll_async"):
                         instance = self.poll_job(instance, "virtualmachine")
+                        if instance and "id" in instance:
+                            self.instance = instance
         return instance
 
     def restart_instance(self):
         instance = self.get_instance()
         # in check mode instance may not be instantiated
         if instance:
-            if instance["state"].lower() in ["running", "starting"]:
+            state = instance["state"].lower()
+            if state in VM_STATES_RUNNING:
                 self.result["changed"] = True
                 if not self.module.check_mode:
                     instance = self.query_api("rebootVirtualMachine", id=instance["id"])
 
-                    poll_async = self.module.params.get("poll_async")
-                    if poll_async:
+                    if self.module.params.get("poll_async"):
                         instance = self.poll_job(instance, "virtualmachine")
+                        if instance and "id" in instance:
+                            self.instance = instance
 
-            elif instance["state"].lower() in ["stopping", "stopped"]:
+            elif state in VM_STATES_STOPPED:
                 instance = self.start_instance()
         return instance
 
@@ -1089,44 +1411,50 @@ class AnsibleCloudStackInstance(AnsibleCloudStack):
             args["virtualmachineid"] = instance["id"]
             res = self.query_api("restoreVirtualMachine", **args)
 
-            poll_async = self.module.params.get("poll_async")
-            if poll_async:
+            if self.module.params.get("poll_async"):
                 instance = self.poll_job(res, "virtualmachine")
+                if instance and "id" in instance:
+                    self.instance = instance
         return instance
 
     def get_result(self, resource):
-        resource = self.get_instance(refresh=True)
+        # The lifecycle methods store each polled job result on
+        # self.instance, so the cached state is authoritative and another
+        # listVirtualMachines round trip is only needed when polling was
+        # disabled and all we hold is a job reference.
+        if self.module.params.get("poll_async"):
+            resource = self.get_instance()
+        else:
+            resource = self.get_instance(refresh=True)
         super(AnsibleCloudStackInstance, self).get_result(resource)
         if resource:
             self.result["user_data"] = self._get_instance_user_data(resource)
             if "securitygroup" in resource:
-                security_groups = []
-                for securitygroup in resource["securitygroup"]:
-                    security_groups.append(securitygroup["name"])
-                self.result["security_groups"] = security_groups
+                self.result["security_groups"] = [securitygroup["name"] for securitygroup in resource["securitygroup"]]
             if "affinitygroup" in resource:
-                affinity_groups = []
-                for affinitygroup in resource["affinitygroup"]:
-                    affinity_groups.append(affinitygroup["name"])
-                self.result["affinity_groups"] = affinity_groups
-            if "nic" in resource:
-                for nic in resource["nic"]:
-                    if nic["isdefault"]:
-                        if "ipaddress" in nic:
-                            self.result["default_ip"] = nic["ipaddress"]
-                        if "ip6address" in nic:
-                            self.result["default_ip6"] = nic["ip6address"]
+                self.result["affinity_groups"] = [affinitygroup["name"] for affinitygroup in resource["affinitygroup"]]
+            # Stop scanning the nics once the default one is found.
+            default_nic = next((nic for nic in resource.get("nic", ()) if nic["isdefault"]), None)
+            if default_nic is not None:
+                if "ipaddress" in default_nic:
+                    self.result["default_ip"] = default_nic["ipaddress"]
+                if "ip6address" in default_nic:
+                    self.result["default_ip6"] = default_nic["ip6address"]
         return self.result
 
 
 def main():
+    # Deferred so importing the module for documentation or introspection
+    # does not pay for AnsibleModule.
+    from ansible.module_utils.basic import AnsibleModule
+
     argument_spec = cs_argument_spec()
     argument_spec.update(
         dict(
             name=dict(),
             display_name=dict(),
             group=dict(),
-            state=dict(choices=["present", "deployed", "started", "stopped", "restarted", "restored", "absent", "destroyed", "expunged"], default="present"),
+            state=dict(choices=list(STATE_CHOICES), default="present"),
             service_offering=dict(),
             cpu=dict(type="int"),
             cpu_speed=dict(type="int"),
@@ -1136,7 +1464,7 @@ def main():
             template_filter=dict(
                 default="executable",
                 aliases=["iso_filter"],
-                choices=["all", "featured", "self", "selfexecutable", "sharedexecutable", "executable", "community"],
+                choices=list(TEMPLATE_FILTER_CHOICES),
             ),
             networks=dict(type="list", elements="str", aliases=["network"]),
             ip_to_networks=dict(type="list", elements="dict", aliases=["ip_to_network"]),
@@ -1145,7 +1473,7 @@ def main():
             disk_offering=dict(),
             disk_size=dict(type="int"),
             root_disk_size=dict(type="int"),
-            keyboard=dict(type="str", choices=["de", "de-ch", "es", "fi", "fr", "fr-be", "fr-ch", "is", "it", "jp", "nl-be", "no", "pt", "uk", "us"]),
+            keyboard=dict(type="str", choices=list(KEYBOARD_CHOICES)),
             hypervisor=dict(),
             host=dict(),
             cluster=dict(),
@@ -1183,30 +1511,35 @@ def main():
 
     state = module.params.get("state")
 
-    if state in ["absent", "destroyed"]:
-        instance = ainstance.absent_instance()
-
-    elif state in ["expunged"]:
-        instance = ainstance.expunge_instance()
-
-    elif state in ["restored"]:
+    def restored_instance():
         ainstance.present_instance()
-        instance = ainstance.restore_instance()
-
-    elif state in ["present", "deployed"]:
-        instance = ainstance.present_instance()
+        return ainstance.restore_instance()
 
-    elif state in ["stopped"]:
+    def stopped_instance():
         ainstance.present_instance(start_vm=False)
-        instance = ainstance.stop_instance()
+        return ainstance.stop_instance()
 
-    elif state in ["started"]:
+    def started_instance():
         ainstance.present_instance()
-        instance = ainstance.start_instance()
+        return ainstance.start_instance()
 
-    elif state in ["restarted"]:
+    def restarted_instance():
         ainstance.present_instance()
-        instance = ainstance.restart_instance()
+        return ainstance.restart_instance()
+
+    state_handlers = {
+        "absent": ainstance.absent_instance,
+        "destroyed": ainstance.absent_instance,
+        "expunged": ainstance.expunge_instance,
+        "restored": restored_instance,
+        "present": ainstance.present_instance,
+        "deployed": ainstance.present_instance,
+        "stopped": stopped_instance,
+        "started": started_instance,
+        "restarted": restarted_instance,
+    }
+
+    instance = state_handlers[state]()
 
     if instance and "state" in instance and instance["state"].lower() == "error":
         module.fail_json(msg="Instance named '%s' in error state." % module.params.get("name"))